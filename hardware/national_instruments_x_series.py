@@ -20,8 +20,10 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import functools
 import numpy as np
 import re
+from types import MappingProxyType
 
 import PyDAQmx as daq
 
@@ -33,6 +35,9 @@ from interface.slow_counter_interface import CountingMode
 from interface.odmr_counter_interface import ODMRCounterInterface
 from interface.confocal_scanner_interface import ConfocalScannerInterface
 
+# device and channel name of a physical channel like '/Dev1/Ctr0'
+_CHAN_RE = re.compile(r'^/(?P<dev>[0-9A-Za-z\- ]+[0-9A-Za-z\-_ ]*)/(?P<chan>[0-9A-Za-z]+)')
+
 
 class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInterface, ODMRCounterInterface):
     """ A National Instruments device that can count and control microvave generators.
@@ -135,19 +140,68 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         self._scanner_ao_task = None
         self._scanner_counter_daq_tasks = list()
         self._line_length = None
+        # line length the scanner clock, counter and analog input tasks are committed for
+        self._line_tasks_length = None
+        # persistent readout buffers of the scanner, see _set_up_line
+        self._scan_data = None
+        self._analog_data = None
         self._odmr_length = None
+        self._odmr_data = None
+        self._odmr_analog_data = None
+        self._odmr_real_data = None
+        self._odmr_differential_data = None
+        # count rates returned by count_odmr, the two arrays are filled in turns
+        self._odmr_outputs = [None, None]
+        self._odmr_output_index = 0
+        # blocking reads of count_odmr with all arguments bound, see set_odmr_length
+        self._odmr_counter_reader = None
+        self._odmr_analog_reader = None
+        self._odmr_read_samples = daq.int32()
+        self._odmr_analog_read_samples = daq.int32()
         self._gated_counter_daq_task = None
         self._scanner_analog_daq_task = None
         self._odmr_pulser_daq_task = None
+        self._set_up_digital_out_state()
         self._oversampling = 0
         self._lock_in_active = False
+        self._samples_number = self._default_samples_number
+
+        # persistent readout buffers of the slow counter, see _set_up_counter_buffers
+        self._counter_count_buf = None
+        self._counter_cps_buf = None
+        self._counter_error_buf = None
+
+        # ctypes variables the driver writes the number of read or written samples to
+        self._analog_read_samples = daq.int32()
+        self._AONwritten = daq.int32()
+        self._scan_read_samples = daq.int32()
+        self._scan_analog_read_samples = daq.int32()
+        # pointers to the variables above used on every scan line, created only once
+        self._AONwritten_ref = daq.byref(self._AONwritten)
+        self._scan_read_samples_ref = daq.byref(self._scan_read_samples)
+        self._scan_analog_read_samples_ref = daq.byref(self._scan_analog_read_samples)
 
         self._photon_sources = self._photon_sources if self._photon_sources is not None else list()
         self._scanner_counter_channels = self._scanner_counter_channels if self._scanner_counter_channels is not None else list()
         self._scanner_ai_channels = self._scanner_ai_channels if self._scanner_ai_channels is not None else list()
+        # device of each configured channel, needs the channel lists normalised above
+        self._channel_to_device = self._parse_channels()
+        # number of scanner channels, counters and analog inputs, used to size the scan buffers
+        self._n_count_channels = len(self.get_scanner_count_channels())
+
+        # names of the scanner axes, set up together with the analog output task
+        self._scanner_axes = list()
+        # output terminals of the clocks, other tasks are routed to these
+        self._clock_terminal = self._clock_channel + 'InternalOutput'
+        self._scanner_clock_terminal = None
+        if self._scanner_clock_channel is not None:
+            self._scanner_clock_terminal = self._scanner_clock_channel + 'InternalOutput'
+        self._my_scanner_clock_terminal = self._scanner_clock_terminal
 
         # handle all the parameters given by the config
         self._current_position = np.zeros(len(self._scanner_ao_channels))
+        self._scanner_voltage_ranges = np.array(self._scanner_voltage_ranges, dtype=np.float64)
+        self._scanner_position_ranges = np.array(self._scanner_position_ranges, dtype=np.float64)
 
         if len(self._scanner_ao_channels) < len(self._scanner_voltage_ranges):
             self.log.error(
@@ -178,6 +232,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         except:
             self.log.exception('Could not clear AO Out Task.')
 
+        self._set_up_digital_out_state()
+        for channel_name in list(self._digital_out_tasks):
+            self.close_digital_channel(channel_name)
+
         self.reset_hardware()
 
     # =================== SlowCounterInterface Commands ========================
@@ -222,10 +280,6 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Another scanner clock is already running, close this one first.')
             return -1
 
-        # Create handle for task, this task will generate pulse signal for
-        # photon counting
-        my_clock_daq_task = daq.TaskHandle()
-
         # assign the clock frequency, if given
         if clock_frequency is not None:
             if not scanner:
@@ -234,22 +288,27 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 self._scanner_clock_frequency = float(clock_frequency)
         else:
             if not scanner:
-                self._clock_frequency = self._default_clock_frequency
+                self._clock_frequency = float(self._default_clock_frequency)
             else:
-                self._scanner_clock_frequency = self._default_scanner_clock_frequency
+                self._scanner_clock_frequency = float(self._default_scanner_clock_frequency)
 
-        # use the correct clock in this method
+        # use the correct clock in this method and keep the expected maximum count
+        # value per semi period for the counting tasks driven by this clock
         if scanner:
             my_clock_frequency = self._scanner_clock_frequency * 2
+            self._scanner_max_ticks = self._max_counts / self._scanner_clock_frequency
         else:
             my_clock_frequency = self._clock_frequency * 2
+            self._counter_max_ticks = self._max_counts / 2 / self._clock_frequency
 
         # assign the clock channel, if given
         if clock_channel is not None:
             if not scanner:
                 self._clock_channel = clock_channel
+                self._clock_terminal = self._clock_channel + 'InternalOutput'
             else:
                 self._scanner_clock_channel = clock_channel
+                self._scanner_clock_terminal = self._scanner_clock_channel + 'InternalOutput'
 
         # use the correct clock channel in this method
         if scanner:
@@ -267,19 +326,56 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     'in order to use it for your purpose!')
                 return -1
 
-        # Adjust the idle state if necessary
-        my_idle = daq.DAQmx_Val_High if idle else daq.DAQmx_Val_Low
         try:
-            # create task for clock
             task_name = 'ScannerClock' if scanner else 'CounterClock'
-            daq.DAQmxCreateTask(task_name, daq.byref(my_clock_daq_task))
+            my_clock_daq_task = self._create_clock_task(
+                task_name, my_clock_channel, my_clock_frequency / 2, idle)
+
+            if scanner:
+                self._scanner_clock_daq_task = my_clock_daq_task
+                # the new clock has no ODMR sweep or scan line timing yet
+                self._odmr_length = None
+                self._line_tasks_length = None
+            else:
+                # actually start the preconfigured clock task
+                daq.DAQmxStartTask(my_clock_daq_task)
+                self._clock_daq_task = my_clock_daq_task
+        except daq.DAQError as e:
+            self.log.error('Error while setting up clock: {0}'.format(e))
+            return -1
+        except Exception:
+            self.log.exception('Error while setting up clock.')
+            return -1
+        return 0
+
+    def _create_clock_task(self, task_name, clock_channel, frequency, idle=False):
+        """ Creates a continuous pulse train task with a duty cycle of 0.5.
+
+        @param str task_name: name of the new task
+        @param str clock_channel: physical counter channel generating the pulses
+        @param float frequency: pulse frequency in Hz, one semi period is one count interval
+        @param bool idle: idle state of the output, True = high, False = low
+
+        @return daq.TaskHandle: the configured but not yet started clock task
 
+        Raises a DAQError if the driver refuses the configuration, the task is
+        cleared in that case.
+        """
+        # Create handle for task, this task will generate pulse signal for
+        # photon counting
+        my_clock_daq_task = daq.TaskHandle()
+        # Adjust the idle state if necessary
+        my_idle = daq.DAQmx_Val_High if idle else daq.DAQmx_Val_Low
+
+        # create task for clock
+        daq.DAQmxCreateTask(task_name, daq.byref(my_clock_daq_task))
+        try:
             # create a digital clock channel with specific clock frequency:
             daq.DAQmxCreateCOPulseChanFreq(
                 # The task to which to add the channels
                 my_clock_daq_task,
                 # which channel is used?
-                my_clock_channel,
+                clock_channel,
                 # Name to assign to task (NIDAQ uses by # default the physical channel name as
                 # the virtual channel name. If name is specified, then you must use the name
                 # when you refer to that channel in other NIDAQ functions)
@@ -290,8 +386,8 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 my_idle,
                 # initial delay
                 0,
-                # pulse frequency, divide by 2 such that length of semi period = count_interval
-                my_clock_frequency / 2,
+                # pulse frequency, such that length of semi period = count_interval
+                frequency,
                 # duty cycle of pulses, 0.5 such that high and low duration are both
                 # equal to count_interval
                 0.5)
@@ -306,17 +402,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 daq.DAQmx_Val_ContSamps,
                 # buffer length which stores temporarily the number of generated samples
                 1000)
-
-            if scanner:
-                self._scanner_clock_daq_task = my_clock_daq_task
-            else:
-                # actually start the preconfigured clock task
-                daq.DAQmxStartTask(my_clock_daq_task)
-                self._clock_daq_task = my_clock_daq_task
         except:
-            self.log.exception('Error while setting up clock.')
-            return -1
-        return 0
+            daq.DAQmxClearTask(my_clock_daq_task)
+            raise
+        return my_clock_daq_task
 
     def set_up_counter(self,
                        counter_channels=None,
@@ -347,7 +436,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         my_counter_channels = counter_channels if counter_channels else self._counter_channels
         my_photon_sources = sources if sources else self._photon_sources
-        my_clock_channel = clock_channel if clock_channel else self._clock_channel
+        my_clock_terminal = clock_channel + 'InternalOutput' if clock_channel else self._clock_terminal
 
         if len(my_photon_sources) < len(my_counter_channels):
             self.log.error('You have given {0} sources but {1} counting channels.'
@@ -355,6 +444,15 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                            ''.format(len(my_photon_sources), len(my_counter_channels)))
             return -1
 
+        # The counter takes two samples per clock period (high and low time). Keep
+        # at least ten readouts or one second worth of samples in the buffer. An
+        # explicit counter_buffer is given in bins, so it takes two samples per bin.
+        if counter_buffer is not None:
+            my_counter_buffer = 2 * int(counter_buffer)
+        else:
+            my_counter_buffer = max(
+                2 * 10 * int(self._samples_number), int(2 * self._clock_frequency))
+
         try:
             for i, ch in enumerate(my_counter_channels):
                 # This task will count photons with binning defined by the clock_channel
@@ -378,7 +476,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # expected minimum count value
                     0,
                     # Expected maximum count value
-                    self._max_counts / 2 / self._clock_frequency,
+                    self._counter_max_ticks,
                     # units of width measurement, here photon ticks
                     daq.DAQmx_Val_Ticks,
                     # empty extra argument
@@ -392,7 +490,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                         # use this counter channel
                         ch,
                         # assign a named Terminal
-                        my_clock_channel + 'InternalOutput')
+                        my_clock_terminal)
 
                 # Set a Counter Input Control Timebase Source.
                 # Specify the terminal of the timebase which is used for the counter:
@@ -415,7 +513,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # Sample Mode: Acquire or generate samples until you stop the task.
                     daq.DAQmx_Val_ContSamps,
                     # buffer length which stores  temporarily the number of generated samples
-                    1000)
+                    my_counter_buffer)
 
                 # Set the Read point Relative To an operation.
                 # Specifies the point in the buffer at which to begin a read operation.
@@ -460,7 +558,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # Analog in channel timebase
                     daq.DAQmxCfgSampClkTiming(
                         atask,
-                        my_clock_channel + 'InternalOutput',
+                        my_clock_terminal,
                         self._clock_frequency,
                         daq.DAQmx_Val_Rising,
                         daq.DAQmx_Val_ContSamps,
@@ -471,6 +569,8 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.exception('Error while setting up counting task.')
             return -1
 
+        self._set_up_counter_buffers(int(self._samples_number))
+
         try:
             for i, task in enumerate(self._counter_daq_tasks):
                 # Actually start the preconfigured counter task
@@ -493,9 +593,59 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         Most methods calling this might just care about the number of channels, though.
         """
-        ch = self._counter_channels[:]
-        ch.extend(self._counter_ai_channels)
-        return ch
+        # digital counters first and analog inputs last, built here so that
+        # subclasses with their own on_activate get the same list
+        return self._counter_channels + self._counter_ai_channels
+
+    def _set_up_counter_buffers(self, samples):
+        """ Allocates the buffers get_counter reads into, so they can be reused for every readout.
+
+        @param int samples: number of samples per readout
+        """
+        # raw counts of the high and the low time of the clock
+        self._counter_count_buf = np.empty(
+            (len(self._counter_daq_tasks), 2 * samples), dtype=np.uint32)
+        # counts per second and analog values, this is what get_counter returns. Rows of
+        # counter channels without a task are never written and keep the fill value.
+        self._counter_cps_buf = np.full(
+            (len(self._counter_channels) + len(self._counter_ai_channels), samples),
+            222,
+            dtype=np.float64)
+
+        # number of samples which were actually read, will be stored here
+        self._counter_n_read_samples = daq.int32()
+        # Bind all arguments of the blocking counter reads, so that get_counter only
+        # has to call them. Each read writes into one row of the count buffer.
+        self._counter_readers = [
+            functools.partial(
+                daq.DAQmxReadCounterU32,
+                # read from this task
+                task,
+                # number of samples to read
+                2 * samples,
+                # maximal timeout for the read process
+                self._RWTimeout,
+                # write the readout into this array
+                self._counter_count_buf[i],
+                # length of array to write into
+                2 * samples,
+                # number of samples which were read
+                daq.byref(self._counter_n_read_samples),
+                # Reserved for future use. Pass NULL (here None) to this parameter
+                None)
+            for i, task in enumerate(self._counter_daq_tasks)]
+
+    def _get_counter_error_data(self, samples):
+        """ Returns the array of -1 that get_counter hands back on errors.
+
+        @param int samples: number of samples per readout
+
+        @return float [samples]: array filled with -1, cached between calls
+        """
+        shape = (len(self._counter_channels) + len(self._counter_ai_channels), samples)
+        if self._counter_error_buf is None or self._counter_error_buf.shape != shape:
+            self._counter_error_buf = np.full(shape, -1, dtype=np.float64)
+        return self._counter_error_buf
 
     def get_counter(self, samples=None):
         """ Returns the current counts per second of the counter.
@@ -506,55 +656,43 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                             That sets also the length of the readout array.
 
         @return float [samples]: array with entries as photon counts per second
+
+        The returned array is reused by the next call of get_counter, copy it if
+        it has to be kept.
         """
+        if samples is None:
+            samples = int(self._samples_number)
+        else:
+            samples = int(samples)
+
         if len(self._counter_daq_tasks) < 1:
             self.log.error(
                 'No counter running, call set_up_counter before reading it.')
             # in case of error return a lot of -1
-            return np.ones((len(self.get_counter_channels()), samples), dtype=np.uint32) * -1
+            return self._get_counter_error_data(samples)
 
         if len(self._counter_ai_channels) > 0 and self._counter_analog_daq_task is None:
             self.log.error(
                 'No counter analog input task running, call set_up_counter before reading it.')
             # in case of error return a lot of -1
-            return np.ones((len(self.get_counter_channels()), samples), dtype=np.uint32) * -1
+            return self._get_counter_error_data(samples)
 
-        if samples is None:
-            samples = int(self._samples_number)
-        else:
-            samples = int(samples)
+        if self._counter_count_buf is None or self._counter_count_buf.shape[1] != 2 * samples:
+            self._set_up_counter_buffers(samples)
         try:
             # count data will be written here in the NumPy array of length samples
-            count_data = np.empty((len(self._counter_daq_tasks), 2 * samples), dtype=np.uint32)
+            count_data = self._counter_count_buf
 
-            # number of samples which were actually read, will be stored here
-            n_read_samples = daq.int32()
-            for i, task in enumerate(self._counter_daq_tasks):
+            for read_counter in self._counter_readers:
                 # read the counter value: This function is blocking and waits for the
                 # counts to be all filled:
-                daq.DAQmxReadCounterU32(
-                    # read from this task
-                    task,
-                    # number of samples to read
-                    2 * samples,
-                    # maximal timeout for the read process
-                    self._RWTimeout,
-                    # write the readout into this array
-                    count_data[i],
-                    # length of array to write into
-                    2 * samples,
-                    # number of samples which were read
-                    daq.byref(n_read_samples),
-                    # Reserved for future use. Pass NULL (here None) to this parameter
-                    None)
+                read_counter()
 
             # Analog channels
             if len(self._counter_ai_channels) > 0:
                 analog_data = np.full(
                     (len(self._counter_ai_channels), samples), 111, dtype=np.float64)
 
-                analog_read_samples = daq.int32()
-
                 daq.DAQmxReadAnalogF64(
                     self._counter_analog_daq_task,
                     samples,
@@ -562,25 +700,23 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     daq.DAQmx_Val_GroupByChannel,
                     analog_data,
                     len(self._counter_ai_channels) * samples,
-                    daq.byref(analog_read_samples),
+                    daq.byref(self._analog_read_samples),
                     None
                 )
         except:
             self.log.exception(
                 'Getting samples from counter failed.')
             # in case of error return a lot of -1
-            return np.ones((len(self.get_counter_channels()), samples), dtype=np.uint32) * -1
-
-        real_data = np.empty((len(self._counter_channels), samples), dtype=np.uint32)
+            return self._get_counter_error_data(samples)
 
         # add up adjoint pixels to also get the counts from the low time of
         # the clock:
         real_data = count_data[:, ::2]
         real_data += count_data[:, 1::2]
 
-        all_data = np.full((len(self.get_counter_channels()), samples), 222, dtype=np.float64)
+        all_data = self._counter_cps_buf
         # normalize to counts per second for counter channels
-        all_data[0:len(real_data)] = np.array(real_data * self._clock_frequency, np.float64)
+        np.multiply(real_data, self._clock_frequency, out=all_data[0:len(real_data)])
 
         if len(self._counter_ai_channels) > 0:
             all_data[-len(self._counter_ai_channels):] = analog_data
@@ -605,7 +741,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     daq.DAQmxStopTask(task)
                     # after stopping delete all the configuration of the counter
                     daq.DAQmxClearTask(task)
-                except:
+                except daq.DAQError as e:
+                    self.log.error('Could not close scanner counter: {0}'.format(e))
+                    error = -1
+                except Exception:
                     self.log.exception('Could not close scanner counter.')
                     error = -1
             self._scanner_counter_daq_tasks = []
@@ -645,60 +784,77 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         @return int: error code (0:OK, -1:error)
         """
-        if scanner:
-            my_task = self._scanner_clock_daq_task
-        else:
-            my_task = self._clock_daq_task
-        try:
-            # Stop the clock task:
-            daq.DAQmxStopTask(my_task)
+        return self._close_task('_scanner_clock_daq_task' if scanner else '_clock_daq_task', 'clock')
 
-            # After stopping delete all the configuration of the clock:
-            daq.DAQmxClearTask(my_task)
+    def _close_task(self, attr_name, label):
+        """ Stops and clears the task stored in an attribute and sets the attribute to None.
 
-            # Set the task handle to None as a safety
-            if scanner:
-                self._scanner_clock_daq_task = None
-            else:
-                self._clock_daq_task = None
-        except:
-            self.log.exception('Could not close clock.')
+        @param str attr_name: name of the attribute holding the task handle
+        @param str label: name of the task used in error messages
+
+        @return int: error code (0:OK, -1:error)
+        """
+        task = getattr(self, attr_name)
+        if task is None:
+            return 0
+        try:
+            # stop the task
+            daq.DAQmxStopTask(task)
+            # after stopping delete all the configuration of the task
+            daq.DAQmxClearTask(task)
+            # set the task handle to None as a safety
+            setattr(self, attr_name, None)
+        except daq.DAQError as e:
+            self.log.error('Could not close {0}: {1}'.format(label, e))
+            return -1
+        except Exception:
+            self.log.exception('Could not close {0}.'.format(label))
             return -1
         return 0
 
     # ================ End SlowCounterInterface Commands =======================
 
     # ================ ConfocalScannerInterface Commands =======================
-    def reset_hardware(self):
-        """ Resets the NI hardware, so the connection is lost and other
-            programs can access it.
+    def _parse_channels(self):
+        """ Finds the NI device of each configured physical channel.
 
-        @return int: error code (0:OK, -1:error)
+        @return MappingProxyType: read-only mapping of channel name to device name
         """
-        retval = 0
         chanlist = [
             self._odmr_trigger_channel,
             self._clock_channel,
             self._scanner_clock_channel,
             self._gate_in_channel
             ]
-        chanlist.extend(self._scanner_ao_channels)
-        chanlist.extend(self._photon_sources)
-        chanlist.extend(self._counter_channels)
-        chanlist.extend(self._scanner_counter_channels)
+        # subclasses may skip the normalisation in on_activate, so lists can still be None
+        for channels in (self._scanner_ao_channels, self._photon_sources,
+                         self._counter_channels, self._scanner_counter_channels):
+            if channels is not None:
+                chanlist.extend(channels)
 
-        devicelist = []
+        channel_to_device = dict()
         for channel in chanlist:
             if channel is None:
                 continue
-            match = re.match(
-                '^/(?P<dev>[0-9A-Za-z\- ]+[0-9A-Za-z\-_ ]*)/(?P<chan>[0-9A-Za-z]+)',
-                channel)
+            match = _CHAN_RE.match(channel)
             if match:
-                devicelist.append(match.group('dev'))
+                channel_to_device[channel] = match.group('dev')
             else:
                 self.log.error('Did not find device name in {0}.'.format(channel))
-        for device in set(devicelist):
+        return MappingProxyType(channel_to_device)
+
+    def reset_hardware(self):
+        """ Resets the NI hardware, so the connection is lost and other
+            programs can access it.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        retval = 0
+        # subclasses that do not call on_activate of this class have no cached map
+        channel_to_device = getattr(self, '_channel_to_device', None)
+        if channel_to_device is None:
+            channel_to_device = self._parse_channels()
+        for device in set(channel_to_device.values()):
             self.log.info('Reset device {0}.'.format(device))
             try:
                 daq.DAQmxResetDevice(device)
@@ -714,11 +870,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Cannot get channel number, analog output task does not exist.')
             return []
 
-        n_channels = daq.uInt32()
-        daq.DAQmxGetTaskNumChans(self._scanner_ao_task, n_channels)
-        possible_channels = ['x', 'y', 'z', 'a']
-
-        return possible_channels[0:int(n_channels.value)]
+        return self._scanner_axes[:]
 
     def get_scanner_count_channels(self):
         """ Return list of counter channels """
@@ -733,7 +885,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                               and upper limit. The unit of the scan range is
                               meters.
         """
-        return self._scanner_position_ranges
+        return self._scanner_position_ranges.tolist()
 
     def set_position_range(self, myrange=None):
         """ Sets the physical range of the scanner.
@@ -757,18 +909,23 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 ''.format(len(myrange)))
             return -1
 
-        for pos in myrange:
-            if len(pos) != 2:
-                self.log.error(
-                    'Given range limit {1:d} should have dimension 2, but has {0:d} instead.'
-                    ''.format(len(pos), pos))
-                return -1
-            if pos[0]>pos[1]:
-                self.log.error(
-                    'Given range limit {0:d} has the wrong order.'.format(pos))
-                return -1
+        try:
+            my_range = np.array(myrange, dtype=np.float64)
+        except (TypeError, ValueError):
+            self.log.error('Given range limits are no numbers.')
+            return -1
+
+        if my_range.shape != (4, 2):
+            self.log.error(
+                'Given range limits should have dimension 2, but the range has shape {0} '
+                'instead.'.format(my_range.shape))
+            return -1
+
+        if np.any(my_range[:, 0] > my_range[:, 1]):
+            self.log.error('Given range limits {0} have the wrong order.'.format(my_range.tolist()))
+            return -1
 
-        self._scanner_position_ranges = myrange
+        self._scanner_position_ranges = my_range
         return 0
 
     def set_voltage_range(self, myrange=None):
@@ -778,7 +935,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         @return int: error code (0:OK, -1:error)
         """
-        n_ch = len(self.get_scanner_axes())
+        n_ch = len(self._scanner_axes)
         if myrange is None:
             myrange = [[-10., 10.], [-10., 10.], [-10., 10.], [-10., 10.]][0:n_ch]
 
@@ -792,12 +949,23 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 ''.format(len(myrange)))
             return -1
 
-        for r in myrange:
-            if r[0] > r[1]:
-                self.log.error('Given range limit {0:d} has the wrong order.'.format(r))
-                return -1
+        try:
+            my_range = np.array(myrange, dtype=np.float64)
+        except (TypeError, ValueError):
+            self.log.error('Given range limits are no numbers.')
+            return -1
 
-        self._scanner_voltage_ranges = myrange
+        if my_range.shape != (n_ch, 2):
+            self.log.error(
+                'Given range limits should have dimension 2, but the range has shape {0} '
+                'instead.'.format(my_range.shape))
+            return -1
+
+        if np.any(my_range[:, 0] > my_range[:, 1]):
+            self.log.error('Given range limits {0} have the wrong order.'.format(my_range.tolist()))
+            return -1
+
+        self._scanner_voltage_ranges = my_range
         return 0
 
     def _start_analog_output(self):
@@ -824,23 +992,36 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # create the actual analog output task on the hardware device. Via
             # byref you pass the pointer of the object to the TaskCreation function:
             daq.DAQmxCreateTask('ScannerAO', daq.byref(self._scanner_ao_task))
-            for n, chan in enumerate(self._scanner_ao_channels):
-                # Assign and configure the created task to an analog output voltage channel.
-                daq.DAQmxCreateAOVoltageChan(
-                    # The AO voltage operation function is assigned to this task.
-                    self._scanner_ao_task,
-                    # use (all) scanner ao_channels for the output
-                    chan,
-                    # assign a name for that channel
-                    'Scanner AO Channel {0}'.format(n),
-                    # minimum possible voltage
-                    self._scanner_voltage_ranges[n][0],
-                    # maximum possible voltage
-                    self._scanner_voltage_ranges[n][1],
-                    # units is Volt
-                    daq.DAQmx_Val_Volts,
-                    # empty for future use
-                    '')
+            # Assign all scanner ao channels to the task with a single call, using
+            # the widest of the configured voltage ranges.
+            ao_names = ['Scanner AO Channel {0}'.format(n)
+                        for n in range(len(self._scanner_ao_channels))]
+            ao_ranges = self._scanner_voltage_ranges[0:len(self._scanner_ao_channels)]
+            ao_min = float(ao_ranges[:, 0].min())
+            ao_max = float(ao_ranges[:, 1].max())
+            daq.DAQmxCreateAOVoltageChan(
+                # The AO voltage operation function is assigned to this task.
+                self._scanner_ao_task,
+                # use (all) scanner ao_channels for the output
+                ', '.join(self._scanner_ao_channels),
+                # assign a name for each channel
+                ', '.join(ao_names),
+                # minimum possible voltage
+                ao_min,
+                # maximum possible voltage
+                ao_max,
+                # units is Volt
+                daq.DAQmx_Val_Volts,
+                # empty for future use
+                '')
+            # narrow down the range of channels with a smaller voltage range
+            for name, (v_min, v_max) in zip(ao_names, ao_ranges):
+                if v_min != ao_min:
+                    daq.DAQmxSetAOMin(self._scanner_ao_task, name, v_min)
+                if v_max != ao_max:
+                    daq.DAQmxSetAOMax(self._scanner_ao_task, name, v_max)
+            # one scanner axis per analog output channel
+            self._scanner_axes = ['x', 'y', 'z', 'a'][0:len(self._scanner_ao_channels)]
         except:
             self.log.exception('Error starting analog output task.')
             return -1
@@ -908,10 +1089,13 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         if self._scanner_clock_daq_task is None and clock_channel is None:
             self.log.error('No clock running, call set_up_clock before starting the counter.')
             return -1
+        # the new tasks have no scan line timing yet, let _set_up_line configure it
+        self._line_tasks_length = None
 
         my_counter_channels = counter_channels if counter_channels else self._scanner_counter_channels
         my_photon_sources = sources if sources else self._photon_sources
         self._my_scanner_clock_channel = clock_channel if clock_channel else self._scanner_clock_channel
+        self._my_scanner_clock_terminal = self._my_scanner_clock_channel + 'InternalOutput'
 
         if scanner_ao_channels is not None:
             self._scanner_ao_channels = scanner_ao_channels
@@ -955,7 +1139,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # expected minimum value
                     0,
                     # Expected maximum count value
-                    self._max_counts / self._scanner_clock_frequency,
+                    self._scanner_max_ticks,
                     # units of width measurement, here Timebase photon ticks
                     daq.DAQmx_Val_Ticks,
                     '')
@@ -968,7 +1152,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # use this counter channel
                     ch,
                     # assign a Terminal Name
-                    self._my_scanner_clock_channel + 'InternalOutput')
+                    self._my_scanner_clock_terminal)
 
                 # Set a CounterInput Control Timebase Source.
                 # Specify the terminal of the timebase which is used for the counter:
@@ -1000,7 +1184,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     ''
                 )
                 self._scanner_analog_daq_task = atask
-        except:
+        except daq.DAQError as e:
+            self.log.error('Error while setting up scanner: {0}'.format(e))
+            retval = -1
+        except Exception:
             self.log.exception('Error while setting up scanner.')
             retval = -1
 
@@ -1022,39 +1209,32 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Another scan_line is already running, close this one first.')
             return -1
 
-        if x is not None:
-            if not(self._scanner_position_ranges[0][0] <= x <= self._scanner_position_ranges[0][1]):
-                self.log.error('You want to set x out of range: {0:f}.'.format(x))
-                return -1
-            self._current_position[0] = np.float(x)
-
-        if y is not None:
-            if not(self._scanner_position_ranges[1][0] <= y <= self._scanner_position_ranges[1][1]):
-                self.log.error('You want to set y out of range: {0:f}.'.format(y))
-                return -1
-            self._current_position[1] = np.float(y)
-
-        if z is not None:
-            if not(self._scanner_position_ranges[2][0] <= z <= self._scanner_position_ranges[2][1]):
-                self.log.error('You want to set z out of range: {0:f}.'.format(z))
-                return -1
-            self._current_position[2] = np.float(z)
-
-        if a is not None:
-            if not(self._scanner_position_ranges[3][0] <= a <= self._scanner_position_ranges[3][1]):
-                self.log.error('You want to set a out of range: {0:f}.'.format(a))
-                return -1
-            self._current_position[3] = np.float(a)
+        # axes that are not given become NaN, which never compares as out of range
+        n_axes = len(self._current_position)
+        values = np.array((x, y, z, a), dtype=np.float64)[0:n_axes]
+        position_range = self._scanner_position_ranges[0:n_axes]
+        out_of_range = (values < position_range[:, 0]) | (values > position_range[:, 1])
+        if np.any(out_of_range):
+            i = int(np.argmax(out_of_range))
+            self.log.error('You want to set {0} out of range: {1:f}.'.format(
+                ('x', 'y', 'z', 'a')[i], values[i]))
+            return -1
+        given = ~np.isnan(values)
+        self._current_position[given] = values[given]
 
-        # the position has to be a vstack
-        my_position = np.vstack(self._current_position)
+        # the position has to be a column per axis, this is a view and no copy
+        my_position = self._current_position[:, np.newaxis]
 
         # then directly write the position to the hardware
         try:
             self._write_scanner_ao(
                 voltages=self._scanner_position_to_volt(my_position),
                 start=True)
-        except:
+        except daq.DAQError as e:
+            self.log.error('Error while setting the scanner position: {0}'.format(e))
+            return -1
+        except Exception:
+            self.log.exception('Error while setting the scanner position.')
             return -1
         return 0
 
@@ -1069,10 +1249,13 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         n depends on how many channels are configured for analog output
         """
-        # Number of samples which were actually written, will be stored here.
-        # The error code of this variable can be asked with .value to check
-        # whether all channels have been written successfully.
-        self._AONwritten = daq.int32()
+        # DAQmx reads the voltages directly from this buffer, so it has to be a
+        # C-contiguous float64 array. Arrays that already are are not copied.
+        voltages = np.ascontiguousarray(voltages, dtype=np.float64)
+
+        # Number of samples which were actually written will be stored in
+        # self._AONwritten. The error code of this variable can be asked with
+        # .value to check whether all channels have been written successfully.
         # write the voltage instructions for the analog output to the hardware
         daq.DAQmxWriteAnalogF64(
             # write to this task
@@ -1088,7 +1271,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # the voltages to be written
             voltages,
             # The actual number of samples per channel successfully written to the buffer
-            daq.byref(self._AONwritten),
+            self._AONwritten_ref,
             # Reserved for future use. Pass NULL(here None) to this parameter
             None)
         return self._AONwritten.value
@@ -1105,26 +1288,30 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             but x, xy, xyz and xyza are allowed formats.
         """
 
-        if not isinstance(positions, (frozenset, list, set, tuple, np.ndarray, )):
+        try:
+            positions = np.asarray(positions, dtype=np.float64)
+        except (TypeError, ValueError):
             self.log.error('Given position list is no array type.')
             return np.array([np.NaN])
-
-        vlist = []
-        for i, position in enumerate(positions):
-            vlist.append(
-                (self._scanner_voltage_ranges[i][1] - self._scanner_voltage_ranges[i][0])
-                / (self._scanner_position_ranges[i][1] - self._scanner_position_ranges[i][0])
-                * (position - self._scanner_position_ranges[i][0])
-                + self._scanner_voltage_ranges[i][0]
-            )
-        volts = np.vstack(vlist)
-
-        for i, v in enumerate(volts):
-            if v.min() < self._scanner_voltage_ranges[i][0] or v.max() > self._scanner_voltage_ranges[i][1]:
-                self.log.error(
-                    'Voltages ({0}, {1}) exceed the limit, the positions have to '
-                    'be adjusted to stay in the given range.'.format(v.min(), v.max()))
-                return np.array([np.NaN])
+        n_axes = len(positions)
+        # lower and upper limits of the used axes as (n_axes, 1) columns
+        v_min = self._scanner_voltage_ranges[0:n_axes, 0:1]
+        v_max = self._scanner_voltage_ranges[0:n_axes, 1:2]
+        p_min = self._scanner_position_ranges[0:n_axes, 0:1]
+        p_max = self._scanner_position_ranges[0:n_axes, 1:2]
+
+        # map all axes at once, a single position per axis becomes a column as well
+        volts = positions.reshape(n_axes, -1) - p_min
+        volts *= (v_max - v_min) / (p_max - p_min)
+        volts += v_min
+
+        out_of_range = np.any(volts < v_min, axis=1) | np.any(volts > v_max, axis=1)
+        if np.any(out_of_range):
+            v = volts[np.argmax(out_of_range)]
+            self.log.error(
+                'Voltages ({0}, {1}) exceed the limit, the positions have to '
+                'be adjusted to stay in the given range.'.format(v.min(), v.max()))
+            return np.array([np.NaN])
         return volts
 
     def get_scanner_position(self):
@@ -1146,7 +1333,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         """
         if self._scanner_counter_channels and len(self._scanner_counter_daq_tasks) < 1:
             self.log.error('Configured counter is not running, cannot scan a line.')
-            return np.array([[-1.]])
+            return -1
 
         if self._scanner_ai_channels and self._scanner_analog_daq_task is None:
             self.log.error('Configured analog input is not running, cannot scan a line.')
@@ -1154,6 +1341,15 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         self._line_length = length
 
+        # (re)allocate the buffers scan_line reads into if the line length changed
+        n_counters = len(self._scanner_counter_channels)
+        if self._scan_data is None or self._scan_data.shape != (n_counters, 2 * length):
+            # count data of the high and low time of each pixel
+            self._scan_data = np.empty((n_counters, 2 * length), dtype=np.uint32)
+        n_analog = len(self._scanner_ai_channels)
+        if self._analog_data is None or self._analog_data.shape != (n_analog, length + 1):
+            self._analog_data = np.empty((n_analog, length + 1), dtype=np.float64)
+
         try:
             # Just a formal check whether length is not a too huge number
             if length < np.inf:
@@ -1167,7 +1363,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # add to this task
                     self._scanner_ao_task,
                     # use this channel as clock
-                    self._my_scanner_clock_channel + 'InternalOutput',
+                    self._my_scanner_clock_terminal,
                     # Maximum expected clock frequency
                     self._scanner_clock_frequency,
                     # Generate sample on falling edge
@@ -1177,66 +1373,89 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # number of samples to generate
                     self._line_length)
 
-            # Configure Implicit Timing for the clock.
-            # Set timing for scanner clock task to the number of pixel.
-            daq.DAQmxCfgImplicitTiming(
-                # define task
-                self._scanner_clock_daq_task,
-                # only a limited number of# counts
-                daq.DAQmx_Val_FiniteSamps,
-                # count twice for each voltage +1 for safety
-                self._line_length + 1)
-
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                # Configure Implicit Timing for the scanner counting task.
-                # Set timing for scanner count task to the number of pixel.
+            # The analog output is switched back to on demand timing after every
+            # line, so it is configured for each line above. The other tasks keep
+            # their timing, they are only configured and committed again if the
+            # line length changed. A committed task returns to the committed
+            # state when it is stopped, so starting it again is cheap.
+            if length != self._line_tasks_length:
+                self._line_tasks_length = None
+                # the clock and counter tasks are shared with the ODMR scan, which
+                # has to configure them again for its own length
+                self._odmr_length = None
+                # Configure Implicit Timing for the clock.
+                # Set timing for scanner clock task to the number of pixel.
                 daq.DAQmxCfgImplicitTiming(
                     # define task
-                    task,
-                    # only a limited number of counts
+                    self._scanner_clock_daq_task,
+                    # only a limited number of# counts
                     daq.DAQmx_Val_FiniteSamps,
                     # count twice for each voltage +1 for safety
-                    2 * self._line_length + 1)
+                    self._line_length + 1)
 
-                # Set the Read point Relative To an operation.
-                # Specifies the point in the buffer at which to begin a read operation,
-                # here we read samples from beginning of acquisition and do not overwrite
-                daq.DAQmxSetReadRelativeTo(
-                    # define to which task to connect this function
-                    task,
-                    # Start reading samples relative to the last sample returned
-                    # by the previous read
-                    daq.DAQmx_Val_CurrReadPos)
+                for i, task in enumerate(self._scanner_counter_daq_tasks):
+                    # Configure Implicit Timing for the scanner counting task.
+                    # Set timing for scanner count task to the number of pixel.
+                    daq.DAQmxCfgImplicitTiming(
+                        # define task
+                        task,
+                        # only a limited number of counts
+                        daq.DAQmx_Val_FiniteSamps,
+                        # count twice for each voltage +1 for safety
+                        2 * self._line_length + 1)
+
+                    # Set the Read point Relative To an operation.
+                    # Specifies the point in the buffer at which to begin a read operation,
+                    # here we read samples from beginning of acquisition and do not overwrite
+                    daq.DAQmxSetReadRelativeTo(
+                        # define to which task to connect this function
+                        task,
+                        # Start reading samples relative to the last sample returned
+                        # by the previous read
+                        daq.DAQmx_Val_CurrReadPos)
+
+                    # Set the Read Offset.
+                    # Specifies an offset in samples per channel at which to begin a read
+                    # operation. This offset is relative to the location you specify with
+                    # RelativeTo. Here we do not read the first sample.
+                    daq.DAQmxSetReadOffset(
+                        # connect to this task
+                        task,
+                        # Offset after which to read
+                        1)
 
-                # Set the Read Offset.
-                # Specifies an offset in samples per channel at which to begin a read
-                # operation. This offset is relative to the location you specify with
-                # RelativeTo. Here we do not read the first sample.
-                daq.DAQmxSetReadOffset(
-                    # connect to this task
-                    task,
-                    # Offset after which to read
-                    1)
+                    # Set Read OverWrite Mode.
+                    # Specifies whether to overwrite samples in the buffer that you have
+                    # not yet read. Unread data in buffer will be overwritten:
+                    daq.DAQmxSetReadOverWrite(
+                        task,
+                        daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
 
-                # Set Read OverWrite Mode.
-                # Specifies whether to overwrite samples in the buffer that you have
-                # not yet read. Unread data in buffer will be overwritten:
-                daq.DAQmxSetReadOverWrite(
-                    task,
-                    daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
+                # Analog channels
+                if self._scanner_ai_channels:
+                    # Analog in channel timebase
+                    daq.DAQmxCfgSampClkTiming(
+                        self._scanner_analog_daq_task,
+                        self._scanner_clock_terminal,
+                        self._scanner_clock_frequency,
+                        daq.DAQmx_Val_Rising,
+                        daq.DAQmx_Val_ContSamps,
+                        self._line_length + 1
+                    )
 
-            # Analog channels
-            if self._scanner_ai_channels:
-                # Analog in channel timebase
-                daq.DAQmxCfgSampClkTiming(
-                    self._scanner_analog_daq_task,
-                    self._scanner_clock_channel + 'InternalOutput',
-                    self._scanner_clock_frequency,
-                    daq.DAQmx_Val_Rising,
-                    daq.DAQmx_Val_ContSamps,
-                    self._line_length + 1
-                )
-        except:
+                # Commit the configured tasks, i.e. reserve and program the hardware
+                # resources now.
+                line_tasks = [self._scanner_clock_daq_task]
+                line_tasks.extend(self._scanner_counter_daq_tasks)
+                if self._scanner_ai_channels:
+                    line_tasks.append(self._scanner_analog_daq_task)
+                for task in line_tasks:
+                    daq.DAQmxTaskControl(task, daq.DAQmx_Val_Task_Commit)
+                self._line_tasks_length = length
+        except daq.DAQError as e:
+            self.log.error('Error while setting up scanner to scan a line: {0}'.format(e))
+            return -1
+        except Exception:
             self.log.exception('Error while setting up scanner to scan a line.')
             return -1
         return 0
@@ -1264,145 +1483,148 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Configured analog input is not running, cannot scan a line.')
             return -1
 
-        if not isinstance(line_path, (frozenset, list, set, tuple, np.ndarray, ) ):
+        try:
+            line_path = np.ascontiguousarray(line_path, dtype=np.float64)
+        except (TypeError, ValueError):
+            line_path = None
+        if line_path is None or line_path.ndim != 2:
             self.log.error('Given line_path list is not array type.')
             return np.array([[-1.]])
         try:
-            # set task timing to use a sampling clock:
-            # specify how the Data of the selected task is collected, i.e. set it
-            # now to be sampled by a hardware (clock) signal.
-            daq.DAQmxSetSampTimingType(self._scanner_ao_task, daq.DAQmx_Val_SampClk)
-            self._set_up_line(np.shape(line_path)[1])
             line_volts = self._scanner_position_to_volt(line_path)
-            # write the positions to the analog output
-            written_voltages = self._write_scanner_ao(
-                voltages=line_volts,
-                length=self._line_length,
-                start=False)
-
-            # start the timed analog output task
-            daq.DAQmxStartTask(self._scanner_ao_task)
+            all_data = self._scan_line_fast(line_volts, pixel_clock=pixel_clock)
 
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                daq.DAQmxStopTask(task)
-
-            daq.DAQmxStopTask(self._scanner_clock_daq_task)
-
-            if pixel_clock and self._pixel_clock_channel is not None:
-                daq.DAQmxConnectTerms(
-                    self._scanner_clock_channel + 'InternalOutput',
-                    self._pixel_clock_channel,
-                    daq.DAQmx_Val_DoNotInvertPolarity)
-
-            # start the scanner counting task that acquires counts synchroneously
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                daq.DAQmxStartTask(task)
-
-            if self._scanner_ai_channels:
-                daq.DAQmxStartTask(self._scanner_analog_daq_task)
+            # update the scanner position instance variable
+            self._current_position[0:len(line_path)] = line_path[:, -1]
+        except (daq.DAQError, RuntimeError) as e:
+            self.log.error('Error while scanning line: {0}'.format(e))
+            return np.array([[-1.]])
+        except Exception:
+            self.log.exception('Error while scanning line.')
+            return np.array([[-1.]])
+        # return values is a rate of counts/s
+        return all_data
 
-            daq.DAQmxStartTask(self._scanner_clock_daq_task)
+    def _scan_line_fast(self, line_volts, pixel_clock=False):
+        """ Scans a line given in voltages, without any checks of the input.
 
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                # wait for the scanner counter to finish
-                daq.DAQmxWaitUntilTaskDone(
-                    # define task
-                    task,
-                    # Maximum timeout for the counter times the positions. Unit is seconds.
-                    self._RWTimeout * 2 * self._line_length)
+        @param float[c][m] line_volts: C-contiguous float64 array of the output
+            voltages of the c scanner axes (m = samples per line)
+        @param bool pixel_clock: whether we need to output a pixel clock for this line
 
-            # wait for the scanner clock to finish
-            daq.DAQmxWaitUntilTaskDone(
-                # define task
-                self._scanner_clock_daq_task,
-                # maximal timeout for the counter times the positions
-                self._RWTimeout * 2 * self._line_length)
+        @return float[m][n]: m (samples per line) n-channel photon counts per second
 
-            # count data will be written here
-            self._scan_data = np.empty(
-                (len(self.get_scanner_count_channels()), 2 * self._line_length),
-                dtype=np.uint32)
+        This is the hardware part of scan_line for callers that already hold
+        the line in voltages, e.g. a whole frame converted at once. The
+        scanner position is not updated. A DAQError of the line is raised to
+        the caller. If the tasks cannot be set up for the line, the reason is
+        logged and a RuntimeError is raised before any task is started.
+        """
+        # _set_up_line switches the analog output to sample clock timing,
+        # DAQmxCfgSampClkTiming sets the sample timing type as well
+        if self._set_up_line(line_volts.shape[1]) < 0:
+            raise RuntimeError(
+                'Scanner could not be set up for a line of {0:d} pixels.'.format(line_volts.shape[1]))
+        # write the positions to the analog output
+        written_voltages = self._write_scanner_ao(
+            voltages=line_volts,
+            length=self._line_length,
+            start=False)
+
+        # start the timed analog output task
+        daq.DAQmxStartTask(self._scanner_ao_task)
+
+        for i, task in enumerate(self._scanner_counter_daq_tasks):
+            daq.DAQmxStopTask(task)
+
+        daq.DAQmxStopTask(self._scanner_clock_daq_task)
+
+        if pixel_clock and self._pixel_clock_channel is not None:
+            daq.DAQmxConnectTerms(
+                self._scanner_clock_terminal,
+                self._pixel_clock_channel,
+                daq.DAQmx_Val_DoNotInvertPolarity)
 
-            # number of samples which were read will be stored here
-            n_read_samples = daq.int32()
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                # actually read the counted photons
-                daq.DAQmxReadCounterU32(
-                    # read from this task
-                    task,
-                    # read number of double the # number of samples
-                    2 * self._line_length,
-                    # maximal timeout for the read# process
-                    self._RWTimeout,
-                    # write into this array
-                    self._scan_data[i],
-                    # length of array to write into
-                    2 * self._line_length,
-                    # number of samples which were actually read
-                    daq.byref(n_read_samples),
-                    # Reserved for future use. Pass NULL(here None) to this parameter.
-                    None)
+        # start the scanner counting task that acquires counts synchroneously
+        for i, task in enumerate(self._scanner_counter_daq_tasks):
+            daq.DAQmxStartTask(task)
 
-                # stop the counter task
-                daq.DAQmxStopTask(task)
+        if self._scanner_ai_channels:
+            daq.DAQmxStartTask(self._scanner_analog_daq_task)
 
-            # Analog channels
-            if self._scanner_ai_channels:
-                self._analog_data = np.full(
-                    (len(self._scanner_ai_channels), self._line_length + 1),
-                    222,
-                    dtype=np.float64)
+        daq.DAQmxStartTask(self._scanner_clock_daq_task)
 
-                analog_read_samples = daq.int32()
+        # Wait for the scanner clock to finish. The counters sample on the
+        # clock pulses, so they are done as well once the clock is. The
+        # blocking reads below wait for any sample still in transfer.
+        daq.DAQmxWaitUntilTaskDone(
+            # define task
+            self._scanner_clock_daq_task,
+            # maximal timeout for the counter times the positions
+            self._RWTimeout * 2 * self._line_length)
 
-                daq.DAQmxReadAnalogF64(
-                    self._scanner_analog_daq_task,
-                    self._line_length + 1,
-                    self._RWTimeout,
-                    daq.DAQmx_Val_GroupByChannel,
-                    self._analog_data,
-                    len(self._scanner_ai_channels) * (self._line_length + 1),
-                    daq.byref(analog_read_samples),
-                    None
-                )
-
-                daq.DAQmxStopTask(self._scanner_analog_daq_task)
+        for i, task in enumerate(self._scanner_counter_daq_tasks):
+            # actually read the counted photons
+            daq.DAQmxReadCounterU32(
+                # read from this task
+                task,
+                # read number of double the # number of samples
+                2 * self._line_length,
+                # maximal timeout for the read# process
+                self._RWTimeout,
+                # write into this array
+                self._scan_data[i],
+                # length of array to write into
+                2 * self._line_length,
+                # number of samples which were actually read
+                self._scan_read_samples_ref,
+                # Reserved for future use. Pass NULL(here None) to this parameter.
+                None)
 
-            # stop the clock task
-            daq.DAQmxStopTask(self._scanner_clock_daq_task)
+            # stop the counter task
+            daq.DAQmxStopTask(task)
 
-            # stop the analog output task
-            self._stop_analog_output()
+        # Analog channels
+        if self._scanner_ai_channels:
+            daq.DAQmxReadAnalogF64(
+                self._scanner_analog_daq_task,
+                self._line_length + 1,
+                self._RWTimeout,
+                daq.DAQmx_Val_GroupByChannel,
+                self._analog_data,
+                len(self._scanner_ai_channels) * (self._line_length + 1),
+                self._scan_analog_read_samples_ref,
+                None
+            )
 
-            if pixel_clock and self._pixel_clock_channel is not None:
-                daq.DAQmxDisconnectTerms(
-                    self._scanner_clock_channel + 'InternalOutput',
-                    self._pixel_clock_channel)
+            daq.DAQmxStopTask(self._scanner_analog_daq_task)
 
-            # create a new array for the final data (this time of the length
-            # number of samples):
-            self._real_data = np.empty(
-                (len(self._scanner_counter_channels), self._line_length),
-                dtype=np.uint32)
+        # stop the clock task
+        daq.DAQmxStopTask(self._scanner_clock_daq_task)
 
-            # add up adjoint pixels to also get the counts from the low time of
-            # the clock:
-            self._real_data = self._scan_data[:, ::2]
-            self._real_data += self._scan_data[:, 1::2]
+        # stop the analog output task
+        self._stop_analog_output()
 
-            all_data = np.full(
-                (len(self.get_scanner_count_channels()), self._line_length), 2, dtype=np.float64)
-            all_data[0:len(self._real_data)] = np.array(
-                self._real_data * self._scanner_clock_frequency, np.float64)
+        if pixel_clock and self._pixel_clock_channel is not None:
+            daq.DAQmxDisconnectTerms(
+                self._scanner_clock_terminal,
+                self._pixel_clock_channel)
 
-            if self._scanner_ai_channels:
-                all_data[len(self._scanner_counter_channels):] = self._analog_data[:, :-1]
+        # add up adjoint pixels to also get the counts from the low time of
+        # the clock. This sums in place, _real_data is a view of _scan_data:
+        n_counters = len(self._scanner_counter_channels)
+        self._real_data = self._scan_data[:, ::2]
+        self._real_data += self._scan_data[:, 1::2]
+
+        # every row is filled below, counter channels first and analog channels last
+        all_data = np.empty((self._n_count_channels, self._line_length), dtype=np.float64)
+        np.multiply(
+            self._real_data,
+            self._scanner_clock_frequency,
+            out=all_data[0:n_counters])
 
-            # update the scanner position instance variable
-            self._current_position = np.array(line_path[:, -1])
-        except:
-            self.log.exception('Error while scanning line.')
-            return np.array([[-1.]])
+        if self._scanner_ai_channels:
+            all_data[n_counters:] = self._analog_data[:, :-1]
         # return values is a rate of counts/s
         return all_data.transpose()
 
@@ -1412,20 +1634,9 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         @return int: error code (0:OK, -1:error)
         """
         a = self._stop_analog_output()
+        self._line_tasks_length = None
 
-        b = 0
-        if self._scanner_ai_channels:
-            try:
-                # stop the counter task
-                daq.DAQmxStopTask(self._scanner_analog_daq_task)
-                # after stopping delete all the configuration of the counter
-                daq.DAQmxClearTask(self._scanner_analog_daq_task)
-                # set the task handle to None as a safety
-                self._scanner_analog_daq_task = None
-            except:
-                self.log.exception('Could not close analog.')
-                b = -1
-
+        b = self._close_task('_scanner_analog_daq_task', 'analog')
         c = self.close_counter(scanner=True)
         return -1 if a < 0 or b < 0 or c < 0 else 0
 
@@ -1481,7 +1692,9 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Another analog is already running, close this one first.')
             return -1
 
-        my_clock_channel = clock_channel if clock_channel else self._scanner_clock_channel
+        my_clock_terminal = clock_channel + 'InternalOutput' if clock_channel else self._scanner_clock_terminal
+        # the new tasks have no sweep timing yet, let set_odmr_length configure it
+        self._odmr_length = None
 
         if self._scanner_counter_channels and self._photon_sources:
             my_counter_channel = counter_channel if counter_channel else self._scanner_counter_channels[0]
@@ -1509,7 +1722,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # Expected minimum count value
                     0,
                     # Expected maximum count value
-                    self._max_counts / self._scanner_clock_frequency,
+                    self._scanner_max_ticks,
                     # units of width measurement, here photon ticks
                     daq.DAQmx_Val_Ticks,
                     '')
@@ -1518,7 +1731,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 daq.DAQmxSetCISemiPeriodTerm(
                     task,
                     my_counter_channel,
-                    my_clock_channel + 'InternalOutput')
+                    my_clock_terminal)
 
                 # define the source of ticks for the counter as self._photon_source
                 daq.DAQmxSetCICtrTimebaseSrc(
@@ -1527,7 +1740,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     my_photon_source)
 
                 self._scanner_counter_daq_tasks.append(task)
-            except:
+            except daq.DAQError as e:
+                self.log.error('Error while setting up the digital counter of ODMR scan: {0}'.format(e))
+                return -1
+            except Exception:
                 self.log.exception('Error while setting up the digital counter of ODMR scan.')
                 return -1
 
@@ -1554,6 +1770,13 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # otherwise, it will be low until task starts, and MW will receive wrong pulses.
             daq.DAQmxStopTask(self._scanner_clock_daq_task)
 
+            # release all lines that digital_channel_switch still holds, else the
+            # pulser and the trigger connection cannot reserve them. PFI lines are
+            # port lines under another name, so the names cannot be compared.
+            self._set_up_digital_out_state()
+            for channel_name in list(self._digital_out_tasks):
+                self.close_digital_channel(channel_name)
+
             if self.lock_in_active:
                 ptask = daq.TaskHandle()
                 daq.DAQmxCreateTask('ODMRPulser', daq.byref(ptask))
@@ -1568,10 +1791,13 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # connect the clock to the trigger channel to give triggers for the
             # microwave
             daq.DAQmxConnectTerms(
-                self._scanner_clock_channel + 'InternalOutput',
+                self._scanner_clock_terminal,
                 self._odmr_trigger_channel,
                 daq.DAQmx_Val_DoNotInvertPolarity)
-        except:
+        except daq.DAQError as e:
+            self.log.error('Error while setting up ODMR scan: {0}'.format(e))
+            return -1
+        except Exception:
             self.log.exception('Error while setting up ODMR scan.')
             return -1
         return 0
@@ -1591,7 +1817,26 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('No analog task is running, cannot do ODMR without one.')
             return -1
 
+        # the tasks are still set up for this length since the last sweep
+        if length == self._odmr_length:
+            return 0
+
         self._odmr_length = length
+
+        # (re)allocate the buffers count_odmr reads into if the sweep length changed
+        if self._odmr_data is None or self._odmr_data.shape != (2 * length + 1, ):
+            # count data of the high and low time of each pixel
+            self._odmr_data = np.empty((2 * length + 1, ), dtype=np.uint32)
+        n_analog = len(self._scanner_ai_channels)
+        if self._odmr_analog_data is None or self._odmr_analog_data.shape != (n_analog, length + 1):
+            self._odmr_analog_data = np.empty((n_analog, length + 1), dtype=np.float64)
+        # summed counts per pixel and the lock-in signal, only used in lock-in mode
+        if self._odmr_real_data is None or self._odmr_real_data.shape != (length, ):
+            self._odmr_real_data = np.empty((length, ), dtype=np.uint32)
+            self._odmr_differential_data = np.empty((length // 2, ), dtype=np.float64)
+
+        # the shared scanner clock gets the sweep timing, scan lines have to set theirs again
+        self._line_tasks_length = None
         try:
             # set timing for odmr clock task to the number of pixel.
             daq.DAQmxCfgImplicitTiming(
@@ -1630,30 +1875,66 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     self._scanner_counter_daq_tasks[0],
                     daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
 
+                # the read of the counted photons, count_odmr only has to call it
+                self._odmr_counter_reader = functools.partial(
+                    daq.DAQmxReadCounterU32,
+                    # read from this task
+                    self._scanner_counter_daq_tasks[0],
+                    # Read number of double the# number of samples
+                    2 * self._odmr_length + 1,
+                    # Maximal timeout for the read # process
+                    self._RWTimeout,
+                    # write into this array
+                    self._odmr_data,
+                    # length of array to write into
+                    2 * self._odmr_length + 1,
+                    # number of samples which were actually read
+                    daq.byref(self._odmr_read_samples),
+                    # Reserved for future use. Pass NULL (here None) to this parameter.
+                    None)
+
             # Analog
             if self._scanner_ai_channels:
                 # Analog in channel timebase
                 daq.DAQmxCfgSampClkTiming(
                     self._scanner_analog_daq_task,
-                    self._scanner_clock_channel + 'InternalOutput',
+                    self._scanner_clock_terminal,
                     self._scanner_clock_frequency,
                     daq.DAQmx_Val_Rising,
                     daq.DAQmx_Val_ContSamps,
                     self._odmr_length + 1
                 )
 
+                self._odmr_analog_reader = functools.partial(
+                    daq.DAQmxReadAnalogF64,
+                    self._scanner_analog_daq_task,
+                    self._odmr_length + 1,
+                    self._RWTimeout,
+                    daq.DAQmx_Val_GroupByChannel,
+                    self._odmr_analog_data,
+                    len(self._scanner_ai_channels) * (self._odmr_length + 1),
+                    daq.byref(self._odmr_analog_read_samples),
+                    None)
+
             if self._odmr_pulser_daq_task:
                 # pulser channel timebase
                 daq.DAQmxCfgSampClkTiming(
                     self._odmr_pulser_daq_task,
-                    self._scanner_clock_channel + 'InternalOutput',
+                    self._scanner_clock_terminal,
                     self._scanner_clock_frequency,
                     daq.DAQmx_Val_Rising,
                     daq.DAQmx_Val_ContSamps,
                     self._odmr_length + 1
                 )
-        except:
+        except daq.DAQError as e:
+            self.log.error('Error while setting up ODMR counter: {0}'.format(e))
+            # configure all tasks again on the next call
+            self._odmr_length = None
+            return -1
+        except Exception:
             self.log.exception('Error while setting up ODMR counter.')
+            # configure all tasks again on the next call
+            self._odmr_length = None
             return -1
         return 0
 
@@ -1691,6 +1972,9 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         @param int length: length of microwave sweep in pixel
 
         @return float[]: the photon counts per second
+
+        The returned array is reused and overwritten by the sweep after the
+        next one, copy it if it has to be kept longer.
         """
         if len(self._scanner_counter_daq_tasks) < 1 and self._scanner_counter_channels:
             self.log.error(
@@ -1717,7 +2001,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 daq.DAQmxStartTask(self._scanner_counter_daq_tasks[0])
             if self._scanner_ai_channels:
                 daq.DAQmxStartTask(self._scanner_analog_daq_task)
-        except:
+        except daq.DAQError as e:
+            self.log.error('Cannot start ODMR counter: {0}'.format(e))
+            return True, np.array([-1.])
+        except Exception:
             self.log.exception('Cannot start ODMR counter.')
             return True, np.array([-1.])
 
@@ -1741,7 +2028,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                                          None)
 
                 daq.DAQmxStartTask(self._odmr_pulser_daq_task)
-            except:
+            except daq.DAQError as e:
+                self.log.error('Cannot start ODMR pulser: {0}'.format(e))
+                return True, np.array([-1.])
+            except Exception:
                 self.log.exception('Cannot start ODMR pulser.')
                 return True, np.array([-1.])
 
@@ -1757,51 +2047,16 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
             # Digital
             if self._scanner_counter_channels:
-                # count data will be written here
-                odmr_data = np.full(
-                    (2 * self._odmr_length + 1, ),
-                    222,
-                    dtype=np.uint32)
-
-                #number of samples which were read will be stored here
-                n_read_samples = daq.int32()
+                # count data will be written here, the buffer is set up by set_odmr_length
+                odmr_data = self._odmr_data
 
                 # actually read the counted photons
-                daq.DAQmxReadCounterU32(
-                    # read from this task
-                    self._scanner_counter_daq_tasks[0],
-                    # Read number of double the# number of samples
-                    2 * self._odmr_length + 1,
-                    # Maximal timeout for the read # process
-                    self._RWTimeout,
-                    # write into this array
-                    odmr_data,
-                    # length of array to write into
-                    2 * self._odmr_length + 1,
-                    # number of samples which were actually read
-                    daq.byref(n_read_samples),
-                    # Reserved for future use. Pass NULL (here None) to this parameter.
-                    None)
+                self._odmr_counter_reader()
 
             # Analog
             if self._scanner_ai_channels:
-                odmr_analog_data = np.full(
-                    (len(self._scanner_ai_channels), self._odmr_length + 1),
-                    222,
-                    dtype=np.float64)
-
-                analog_read_samples = daq.int32()
-
-                daq.DAQmxReadAnalogF64(
-                    self._scanner_analog_daq_task,
-                    self._odmr_length + 1,
-                    self._RWTimeout,
-                    daq.DAQmx_Val_GroupByChannel,
-                    odmr_analog_data,
-                    len(self._scanner_ai_channels) * (self._odmr_length + 1),
-                    daq.byref(analog_read_samples),
-                    None
-                )
+                odmr_analog_data = self._odmr_analog_data
+                self._odmr_analog_reader()
 
             # stop the counter task
             daq.DAQmxStopTask(self._scanner_clock_daq_task)
@@ -1812,102 +2067,84 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             if self._odmr_pulser_daq_task:
                 daq.DAQmxStopTask(self._odmr_pulser_daq_task)
 
-            # prepare array to return data
-            all_data = np.full((len(self.get_odmr_channels()), length),
-                               222,
-                               dtype=np.float64)
+            # prepare array to return data, every row is filled below
+            n_channels = len(self.get_odmr_channels())
+            self._odmr_output_index = 1 - self._odmr_output_index
+            all_data = self._odmr_outputs[self._odmr_output_index]
+            if all_data is None or all_data.shape != (n_channels, length):
+                all_data = np.empty((n_channels, length), dtype=np.float64)
+                self._odmr_outputs[self._odmr_output_index] = all_data
             start_index = 0
             if self._scanner_counter_channels:
-                # create a new array for the final data (this time of the length
-                # number of samples)
-                real_data = np.zeros((self._odmr_length, ), dtype=np.uint32)
-
-                # add upp adjoint pixels to also get the counts from the low time of
-                # the clock:
-
-                real_data += odmr_data[1:-1:2]
-                real_data += odmr_data[:-1:2]
-
+                # add up adjoint pixels to also get the counts from the low time of
+                # the clock
                 if self._odmr_pulser_daq_task:
-                    differential_data = np.zeros((self.oversampling * length, ), dtype=np.float64)
-
-                    differential_data += real_data[1::2]
-                    differential_data -= real_data[::2]
-                    differential_data = np.divide(differential_data, real_data[::2],
-                                                  np.zeros_like(differential_data),
-                                                  where=real_data[::2] != 0)
-
-                    all_data[0] = np.median(np.reshape(differential_data,
-                                                       (-1, self.oversampling)),
-                                            axis=1
-                                            )
+                    real_data = np.add(odmr_data[:-1:2], odmr_data[1:-1:2],
+                                       out=self._odmr_real_data)
+                    all_data[0] = self._odmr_lock_in_signal(real_data[1::2], real_data[::2])
                 else:
-                    all_data[0] = np.array(real_data * self._scanner_clock_frequency, np.float64)
+                    # sum straight into the output row and scale it there, so every
+                    # sample is read once and no intermediate count array is needed
+                    np.add(odmr_data[:-1:2], odmr_data[1:-1:2], out=all_data[0], dtype=np.float64)
+                    all_data[0] *= self._scanner_clock_frequency
                 start_index += 1
 
             if self._scanner_ai_channels:
                 if self._odmr_pulser_daq_task:
                     for i, analog_data in enumerate(odmr_analog_data):
-                        differential_data = np.zeros((self.oversampling * length, ), dtype=np.float64)
-
-                        differential_data += analog_data[1:-1:2]
-                        differential_data -= analog_data[:-1:2]
-                        differential_data = np.divide(differential_data, analog_data[:-1:2],
-                                                      np.zeros_like(differential_data),
-                                                      where=analog_data[:-1:2] != 0)
-
-                        all_data[i+start_index] = np.median(np.reshape(differential_data,
-                                                                       (-1, self.oversampling)),
-                                                            axis=1
-                                                            )
-
+                        all_data[i+start_index] = self._odmr_lock_in_signal(
+                            analog_data[1:-1:2], analog_data[:-1:2])
                 else:
                     all_data[start_index:] = odmr_analog_data[:, :-1]
 
             return False, all_data
-        except:
+        except daq.DAQError as e:
+            self.log.error('Error while counting for ODMR: {0}'.format(e))
+            return True, np.full((len(self.get_odmr_channels()), 1), [-1.])
+        except Exception:
             self.log.exception('Error while counting for ODMR.')
             return True, np.full((len(self.get_odmr_channels()), 1), [-1.])
 
+    def _odmr_lock_in_signal(self, signal, reference):
+        """ Relative difference of the microwave on and off pixels of a lock-in sweep.
+
+        @param numpy.ndarray signal: data of the pixels with microwave on
+        @param numpy.ndarray reference: data of the pixels with microwave off
+
+        @return numpy.ndarray: median of (signal - reference) / reference over
+                               the oversampling, 0 where the reference is 0
+        """
+        differential_data = self._odmr_differential_data
+        np.subtract(signal, reference, out=differential_data, dtype=np.float64)
+        valid = reference != 0
+        np.divide(differential_data, reference, out=differential_data, where=valid)
+        differential_data[~valid] = 0
+        return np.median(np.reshape(differential_data, (-1, self.oversampling)), axis=1)
+
     def close_odmr(self):
         """ Closes the odmr and cleans up afterwards.
 
         @return int: error code (0:OK, -1:error)
         """
         retval = 0
+        self._odmr_length = None
         try:
             # disconnect the trigger channel
             daq.DAQmxDisconnectTerms(
-                self._scanner_clock_channel + 'InternalOutput',
+                self._scanner_clock_terminal,
                 self._odmr_trigger_channel)
 
-        except:
+        except daq.DAQError as e:
+            self.log.error('Error while disconnecting ODMR clock channel: {0}'.format(e))
+            retval = -1
+        except Exception:
             self.log.exception('Error while disconnecting ODMR clock channel.')
             retval = -1
 
-        if self._scanner_ai_channels:
-            try:
-                # stop the counter task
-                daq.DAQmxStopTask(self._scanner_analog_daq_task)
-                # after stopping delete all the configuration of the counter
-                daq.DAQmxClearTask(self._scanner_analog_daq_task)
-                # set the task handle to None as a safety
-                self._scanner_analog_daq_task = None
-            except:
-                self.log.exception('Could not close analog.')
-                retval = -1
-
-        if self._odmr_pulser_daq_task:
-            try:
-                # stop the pulser task
-                daq.DAQmxStopTask(self._odmr_pulser_daq_task)
-                # after stopping delete all the configuration of the pulser
-                daq.DAQmxClearTask(self._odmr_pulser_daq_task)
-                # set the task handle to None as a safety
-                self._odmr_pulser_daq_task = None
-            except:
-                self.log.exception('Could not close pulser.')
-                retval = -1
+        if self._close_task('_scanner_analog_daq_task', 'analog') < 0:
+            retval = -1
+        if self._close_task('_odmr_pulser_daq_task', 'pulser') < 0:
+            retval = -1
 
         retval = -1 if self.close_counter(scanner=True) < 0 or retval < 0 else 0
         return retval
@@ -2180,6 +2417,48 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
     # ======================== Digital channel control ==========================
 
+    def _set_up_digital_out_state(self):
+        """ Creates what digital_channel_switch keeps between calls, if it does not exist yet.
+
+        Subclasses may replace on_activate without calling the one of this class,
+        so the digital output methods call this before they use the state.
+        """
+        if getattr(self, '_digital_out_tasks', None) is not None:
+            return
+        # running digital output tasks of digital_channel_switch by channel name
+        self._digital_out_tasks = dict()
+        # running number for unique task names, tasks may be closed in any order
+        self._digital_out_task_number = 0
+        # samples written by digital_channel_switch for on and off, and the number of written samples
+        self._digital_high = np.full((1, ), 0xffffffff, dtype=np.uint32)
+        self._digital_low = np.zeros((1, ), dtype=np.uint32)
+        self._digital_written = daq.int32()
+        self._digital_written_ref = daq.byref(self._digital_written)
+
+    def close_digital_channel(self, channel_name):
+        """ Stops and clears the output task digital_channel_switch keeps for a channel.
+
+        @param str channel_name: name of the channel, as given to digital_channel_switch
+
+        @return int: error code (0:OK, -1:error)
+
+        The line keeps its last state and can be used by other tasks afterwards.
+        """
+        self._set_up_digital_out_state()
+        task = self._digital_out_tasks.pop(channel_name, None)
+        if task is None:
+            return 0
+        try:
+            daq.DAQmxStopTask(task)
+            daq.DAQmxClearTask(task)
+        except daq.DAQError as e:
+            self.log.error('Could not close digital output task of {0}: {1}'.format(channel_name, e))
+            return -1
+        except Exception:
+            self.log.exception('Could not close digital output task of {0}.'.format(channel_name))
+            return -1
+        return 0
+
     def digital_channel_switch(self, channel_name, mode=True):
         """
         Switches on or off the voltage output (5V) of one of the digital channels, that
@@ -2190,28 +2469,43 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         @param bool mode: specifies if the voltage output of the chosen channel should be turned on or off
 
         @return int: error code (0:OK, -1:error)
+
+        The output task of the channel keeps running and holds the line until
+        close_digital_channel is called or the module is deactivated.
         """
         if channel_name is None:
             self.log.error('No channel for digital output specified')
             return -1
-        else:
 
-            self.digital_out_task = daq.TaskHandle()
-            if mode:
-                self.digital_data = daq.c_uint32(0xffffffff)
-            else:
-                self.digital_data = daq.c_uint32(0x0)
-            self.digital_read = daq.c_int32()
-            self.digital_samples_channel = daq.c_int32(1)
-            daq.DAQmxCreateTask('DigitalOut', daq.byref(self.digital_out_task))
-            daq.DAQmxCreateDOChan(self.digital_out_task, channel_name, "", daq.DAQmx_Val_ChanForAllLines)
-            daq.DAQmxStartTask(self.digital_out_task)
-            daq.DAQmxWriteDigitalU32(self.digital_out_task, self.digital_samples_channel, True,
-                                        self._RWTimeout, daq.DAQmx_Val_GroupByChannel,
-                                        np.array(self.digital_data), self.digital_read, None)
-
-            daq.DAQmxStopTask(self.digital_out_task)
-            daq.DAQmxClearTask(self.digital_out_task)
-            return 0
+        self._set_up_digital_out_state()
+        try:
+            # the task of a channel is created on the first switch and kept
+            # running, later switches only write the new state
+            task = self._digital_out_tasks.get(channel_name)
+            if task is None:
+                task = daq.TaskHandle()
+                self._digital_out_task_number += 1
+                daq.DAQmxCreateTask(
+                    'DigitalOut{0}'.format(self._digital_out_task_number),
+                    daq.byref(task))
+                try:
+                    daq.DAQmxCreateDOChan(task, channel_name, "", daq.DAQmx_Val_ChanForAllLines)
+                    daq.DAQmxStartTask(task)
+                except:
+                    daq.DAQmxClearTask(task)
+                    raise
+                self._digital_out_tasks[channel_name] = task
+
+            daq.DAQmxWriteDigitalU32(task, 1, True,
+                                     self._RWTimeout, daq.DAQmx_Val_GroupByChannel,
+                                     self._digital_high if mode else self._digital_low,
+                                     self._digital_written_ref, None)
+        except daq.DAQError as e:
+            self.log.error('Error while switching digital channel {0}: {1}'.format(channel_name, e))
+            return -1
+        except Exception:
+            self.log.exception('Error while switching digital channel {0}.'.format(channel_name))
+            return -1
+        return 0
 
 